@@ -0,0 +1,228 @@
+"""
+Générateur de corpus médical synthétique (français) pour le benchmark.
+
+Produit des PDF de comptes-rendus fictifs contenant volontairement des données
+sensibles (noms, téléphones, emails, références `Dr.`) afin d'exercer toute la
+chaîne : pdfplumber -> anonymisation -> indexation.
+
+Usage :
+    python corpus.py --count 20 --size medium --out corpus
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+
+SIZES = {
+    "small": 1,
+    "medium": 5,
+    "large": 20,
+}
+
+PRENOMS = [
+    "Jean", "Marie", "Pierre", "Sophie", "Luc", "Camille", "Nicolas", "Julie",
+    "François", "Hélène", "Thomas", "Élodie", "Mathieu", "Chloé", "Antoine", "Inès",
+]
+NOMS = [
+    "Martin", "Bernard", "Dubois", "Durand", "Lefèvre", "Moreau", "Laurent", "Simon",
+    "Michel", "Garcia", "Roux", "Fournier", "Girard", "Bonnet", "Mercier", "Lambert",
+]
+ETABLISSEMENTS = [
+    "CENTRE HOSPITALIER UNIVERSITAIRE", "CLINIQUE DES LILAS", "HÔPITAL SAINT-LOUIS",
+    "CLINIQUE DU PARC", "CENTRE MÉDICAL PASTEUR",
+]
+MOTIFS = [
+    "douleur thoracique atypique", "dyspnée d'effort progressive", "fièvre persistante",
+    "céphalées intenses", "malaise avec perte de connaissance", "douleurs abdominales",
+]
+ANTECEDENTS = [
+    "hypertension artérielle traitée", "diabète de type 2", "asthme depuis l'enfance",
+    "appendicectomie en 2009", "tabagisme sevré", "hypercholestérolémie",
+    "fibrillation atriale paroxystique", "allergie à la pénicilline",
+]
+EXAMENS = [
+    "Tension artérielle à 135/85 mmHg, fréquence cardiaque à 82 bpm.",
+    "Auscultation pulmonaire sans particularité, pas de souffle cardiaque.",
+    "Abdomen souple, dépressible et indolore à la palpation.",
+    "Température à 38,4 °C, saturation à 96 % en air ambiant.",
+    "Examen neurologique normal, pas de déficit sensitivo-moteur.",
+]
+TRAITEMENTS = [
+    "Paracétamol 1 g trois fois par jour", "Amlodipine 5 mg le matin",
+    "Metformine 850 mg deux fois par jour", "Ramipril 2,5 mg le soir",
+    "Salbutamol à la demande", "Atorvastatine 20 mg le soir",
+]
+CONCLUSIONS = [
+    "Évolution favorable, retour à domicile autorisé.",
+    "Surveillance clinique rapprochée recommandée.",
+    "Bilan complémentaire à prévoir en consultation.",
+    "Hospitalisation de courte durée pour surveillance.",
+]
+QUESTIONS = [
+    "Quels sont les antécédents du patient ?",
+    "Quel traitement a été prescrit ?",
+    "Fais un tableau des motifs d'hospitalisation par patient.",
+    "Quelle est la conclusion du compte-rendu ?",
+    "Le patient présente-t-il des allergies ?",
+    "Quels examens cliniques ont été réalisés ?",
+]
+
+LINES_PER_PAGE = 52
+CHARS_PER_LINE = 95
+
+
+def _phone(rng: random.Random) -> str:
+    digits = [f"{rng.randint(0, 99):02d}" for _ in range(4)]
+    first = rng.choice("1234567")
+    style = rng.choice(["spaces", "dots", "intl"])
+    if style == "spaces":
+        return f"0{first} " + " ".join(digits)
+    if style == "dots":
+        return f"0{first}." + ".".join(digits)
+    return f"+33 {first} " + " ".join(digits)
+
+
+def _ascii(value: str) -> str:
+    table = str.maketrans("éèêëàâîïôöûüçÉÈÊÀÂÎÔÛÇ", "eeeeaaiioouucEEEAAIOUC")
+    return value.translate(table).lower()
+
+
+def _wrap(text: str, width: int = CHARS_PER_LINE) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def generate_report(rng: random.Random, pages: int) -> List[str]:
+    """Génère les lignes d'un compte-rendu fictif d'environ `pages` pages."""
+    prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+    medecin = rng.choice(NOMS)
+    civilite = rng.choice(["Monsieur", "Madame"])
+
+    lines = [
+        rng.choice(ETABLISSEMENTS),
+        f"Service de médecine interne - Dr. {medecin}",
+        f"Tél. secrétariat : {_phone(rng)}",
+        "",
+        "COMPTE-RENDU D'HOSPITALISATION",
+        "",
+        f"Nom : {nom}",
+        f"Prénom : {prenom}",
+        f"Né(e) le {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1935, 2005)}",
+        f"Contact : {_phone(rng)} - {_ascii(prenom)}.{_ascii(nom)}@exemple.fr",
+        "",
+    ]
+
+    target = pages * LINES_PER_PAGE
+    visit = 1
+    while len(lines) < target:
+        confrere = rng.choice(NOMS)
+        paragraphs = [
+            f"Consultation n°{visit}. {civilite} {nom} est adressé(e) par le Dr. {confrere} "
+            f"pour {rng.choice(MOTIFS)}.",
+            "Antécédents : " + ", ".join(rng.sample(ANTECEDENTS, 3)) + ".",
+            "Examen clinique : " + " ".join(rng.sample(EXAMENS, 2)),
+            "Traitement : " + ", ".join(rng.sample(TRAITEMENTS, 2)) + ".",
+            f"Le Dr. {medecin} reste joignable au {_phone(rng)} ou par email "
+            f"({_ascii(medecin)}@chu-exemple.fr).",
+            "Conclusion : " + rng.choice(CONCLUSIONS),
+        ]
+        for paragraph in paragraphs:
+            lines.extend(_wrap(paragraph))
+        lines.append("")
+        visit += 1
+
+    return lines[:target]
+
+
+def _escape(line: str) -> bytes:
+    raw = line.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def build_pdf(lines: List[str]) -> bytes:
+    """Écrit un PDF minimal (Helvetica, WinAnsi) sans dépendance externe."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects.append(b"<< /Type /Pages /Kids [" + kids + b"] /Count " + str(len(pages)).encode() + b" >>")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    for pid, page_lines in zip(page_ids, pages):
+        stream = b"BT /F1 9 Tf 14 TL 40 800 Td\n"
+        stream += b"".join(b"(" + _escape(line) + b") Tj T*\n" for line in page_lines)
+        stream += b"ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents " + str(pid + 1).encode() + b" 0 R >>"
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def generate_corpus(out_dir: Path, count: int, pages: int, seed: int = 42) -> Dict:
+    """Génère `count` PDF dans `out_dir` et écrit un manifest.json décrivant le corpus."""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    documents = []
+    for i in range(count):
+        lines = generate_report(rng, pages)
+        filename = f"compte_rendu_{i + 1:04d}.pdf"
+        (out_dir / filename).write_bytes(build_pdf(lines))
+        documents.append({
+            "filename": filename,
+            "pages": -(-len(lines) // LINES_PER_PAGE),
+            "chars": sum(len(line) + 1 for line in lines),
+        })
+
+    manifest = {
+        "seed": seed,
+        "pages_per_document": pages,
+        "documents": documents,
+        "questions": QUESTIONS,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un corpus de PDF médicaux synthétiques.")
+    parser.add_argument("--out", default="corpus", help="Dossier de sortie.")
+    parser.add_argument("--count", type=int, default=10, help="Nombre de documents.")
+    parser.add_argument("--size", choices=SIZES, default="medium", help="Taille prédéfinie des documents.")
+    parser.add_argument("--pages", type=int, help="Nombre de pages par document (remplace --size).")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    pages = args.pages or SIZES[args.size]
+    manifest = generate_corpus(Path(args.out), args.count, pages, args.seed)
+    print(f"✅ {len(manifest['documents'])} PDF générés dans '{args.out}' ({pages} page(s) chacun).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Benchmark de bout en bout du pipeline DocQA-MS.
+
+Étapes mesurées en local (import direct du code des microservices) :
+    pdf_to_text, advanced_anonymization, chunking, embedding, faiss_build, query_embedding, faiss_search
+Étapes mesurées par HTTP (services lancés, LLM-QA branché sur stub_llm) avec --http :
+    upload_pdf (chaîne Ingestor -> De-ID -> Indexeur), ask_qa (charge concurrente)
+
+Les résultats sont sauvegardés en JSON dans results/ et peuvent être comparés
+à une exécution précédente avec --compare.
+
+Usage :
+    python run_benchmark.py --count 10 --size medium
+    python run_benchmark.py --http --concurrency 1,4,16 --compare results/baseline.json
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from corpus import SIZES, generate_corpus
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+
+INGESTOR_URL = os.getenv("INGESTOR_URL", "http://127.0.0.1:8000")
+QA_URL = os.getenv("QA_URL", "http://127.0.0.1:8002")
+DEID_URL = os.getenv("DEID_URL", "http://127.0.0.1:8003")
+INDEXER_URL = os.getenv("INDEXER_URL", "http://127.0.0.1:8001")
+
+
+# --- Statistiques ---
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    # Rang le plus proche : plus petite valeur couvrant au moins pct % des échantillons.
+    index = max(0, min(len(sorted_samples) - 1, math.ceil(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples: List[float], wall_s: Optional[float] = None, units: Optional[Dict[str, float]] = None,
+              errors: int = 0) -> Dict:
+    """Résume une série de latences (en secondes) : percentiles en ms et débits par seconde."""
+    ordered = sorted(samples)
+    wall = wall_s if wall_s is not None else sum(samples)
+    stats = {
+        "count": len(samples),
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "mean_ms": round(1000 * sum(samples) / len(samples), 3) if samples else 0.0,
+        "min_ms": round(1000 * ordered[0], 3) if samples else 0.0,
+        "p50_ms": round(1000 * percentile(ordered, 50), 3),
+        "p95_ms": round(1000 * percentile(ordered, 95), 3),
+        "p99_ms": round(1000 * percentile(ordered, 99), 3),
+        "max_ms": round(1000 * ordered[-1], 3) if samples else 0.0,
+        "throughput": {"ops_per_s": round(len(samples) / wall, 3) if wall else 0.0},
+    }
+    for name, total in (units or {}).items():
+        stats["throughput"][f"{name}_per_s"] = round(total / wall, 3) if wall else 0.0
+    return stats
+
+
+def timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# --- Chargement des microservices ---
+
+def load_service(module_name: str, folder: str):
+    """Importe le main.py d'un microservice sous un nom de module unique."""
+    spec = importlib.util.spec_from_file_location(module_name, ROOT_DIR / folder / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def prepare_workdir(workdir: Path):
+    """Isole les fichiers écrits par les services (documents, index, debug) du dépôt."""
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.environ["DOCS_FOLDER"] = str(workdir / "documents")
+    os.environ["VECTOR_FOLDER"] = str(workdir / "vector_store")
+    os.chdir(workdir)
+
+
+# --- Étapes locales ---
+
+def bench_local(corpus_dir: Path, manifest: Dict, repeat: int, warmup: int) -> Dict[str, Dict]:
+    stages: Dict[str, Dict] = {}
+    documents = manifest["documents"]
+    paths = [corpus_dir / doc["filename"] for doc in documents]
+    total_pages = sum(doc["pages"] for doc in documents)
+
+    print("⏳ Chargement des services (ingestor, deid, indexer)...")
+    ingestor = load_service("bench_doc_ingestor", "doc-ingestor")
+    deid = load_service("bench_deid_service", "deid-service")
+    deid.load_nlp_model()
+    indexer = load_service("bench_semantic_indexer", "semantic-indexer")
+
+    # pdf_to_text
+    for path in paths[:warmup]:
+        ingestor.pdf_to_text(path)
+    samples, texts = [], []
+    for _ in range(repeat):
+        texts = []
+        for path in paths:
+            text, elapsed = timed(ingestor.pdf_to_text, path)
+            samples.append(elapsed)
+            texts.append(text)
+    stages["pdf_to_text"] = summarize(samples, units={
+        "docs": len(paths) * repeat,
+        "pages": total_pages * repeat,
+        "chars": sum(len(t) for t in texts) * repeat,
+    })
+
+    # advanced_anonymization
+    for text in texts[:warmup]:
+        deid.advanced_anonymization(text, "Patient_0")
+    samples, clean_texts = [], []
+    for _ in range(repeat):
+        clean_texts = []
+        for i, text in enumerate(texts, start=1):
+            clean, elapsed = timed(deid.advanced_anonymization, text, f"Patient_{i}")
+            samples.append(elapsed)
+            clean_texts.append(clean)
+    stages["advanced_anonymization"] = summarize(samples, units={
+        "docs": len(texts) * repeat,
+        "chars": sum(len(t) for t in texts) * repeat,
+    })
+
+    # chunking
+    samples, doc_chunks = [], []
+    for _ in range(repeat):
+        doc_chunks = []
+        for text in clean_texts:
+            chunks, elapsed = timed(indexer.text_splitter.split_text, text)
+            samples.append(elapsed)
+            doc_chunks.append(chunks)
+    total_chunks = sum(len(c) for c in doc_chunks)
+    stages["chunking"] = summarize(samples, units={"docs": len(clean_texts) * repeat, "chunks": total_chunks * repeat})
+
+    # embedding
+    for chunks in doc_chunks[:warmup]:
+        indexer.embeddings.embed_documents(chunks)
+    samples, doc_vectors = [], []
+    for _ in range(repeat):
+        doc_vectors = []
+        for chunks in doc_chunks:
+            vectors, elapsed = timed(indexer.embeddings.embed_documents, chunks)
+            samples.append(elapsed)
+            doc_vectors.append(vectors)
+    stages["embedding"] = summarize(samples, units={"docs": len(doc_chunks) * repeat, "chunks": total_chunks * repeat})
+
+    # faiss_build : construction de l'index à partir des vecteurs déjà calculés
+    text_embeddings, metadatas = [], []
+    for doc, chunks, vectors in zip(documents, doc_chunks, doc_vectors):
+        text_embeddings.extend(zip(chunks, vectors))
+        metadatas.extend({"source": doc["filename"]} for _ in chunks)
+    store, elapsed = timed(indexer.FAISS.from_embeddings, text_embeddings, indexer.embeddings, metadatas=metadatas)
+    stages["faiss_build"] = summarize([elapsed], units={"chunks": len(text_embeddings)})
+
+    # query_embedding : même appel que /retrieve-chunks (embeddings.embed_query, sans cache)
+    questions = manifest["questions"]
+    for question in questions[:warmup]:
+        indexer.embeddings.embed_query(question)
+    samples, question_vectors = [], []
+    for _ in range(repeat):
+        question_vectors = []
+        for question in questions:
+            vector, elapsed = timed(indexer.embeddings.embed_query, question)
+            samples.append(elapsed)
+            question_vectors.append(vector)
+    stages["query_embedding"] = summarize(samples, units={"queries": len(questions) * repeat})
+
+    # faiss_search : recherche seule, à partir des vecteurs de questions déjà calculés
+    for vector in question_vectors[:warmup]:
+        store.similarity_search_with_score_by_vector(vector, k=6)
+    samples = []
+    for _ in range(repeat):
+        for vector in question_vectors:
+            _, elapsed = timed(store.similarity_search_with_score_by_vector, vector, k=6)
+            samples.append(elapsed)
+    stages["faiss_search"] = summarize(samples, units={"queries": len(question_vectors) * repeat})
+    stages["faiss_search"]["index_size"] = store.index.ntotal
+
+    return stages
+
+
+# --- Étapes HTTP ---
+
+def indexer_vector_count() -> Optional[int]:
+    """Taille de l'index FAISS du service Indexeur, lue sur son /metrics."""
+    try:
+        response = requests.get(f"{INDEXER_URL}/metrics", timeout=10)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ /metrics de l'Indexeur indisponible : {e}")
+        return None
+    match = re.search(r"^docqa_faiss_index_vectors(?:\{[^}]*\})? (\S+)$", response.text, re.MULTILINE)
+    return int(float(match.group(1))) if match else None
+
+
+def bench_upload(corpus_dir: Path, manifest: Dict) -> Dict:
+    """Envoie chaque PDF à l'Ingestor (séquentiel : le compteur patient du De-ID n'est pas concurrent)."""
+    samples, errors, pages = [], 0, 0
+    start = time.perf_counter()
+    for doc in manifest["documents"]:
+        path = corpus_dir / doc["filename"]
+        t0 = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                response = requests.post(
+                    f"{INGESTOR_URL}/upload-pdf",
+                    files={"file": (doc["filename"], f, "application/pdf")},
+                    timeout=600,
+                )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            errors += 1
+            print(f"⚠️ Upload échoué ({doc['filename']}) : {e}")
+            continue
+        samples.append(time.perf_counter() - t0)
+        pages += doc["pages"]
+    return summarize(samples, wall_s=time.perf_counter() - start, errors=errors, units={"pages": pages})
+
+
+def bench_ask_qa(questions: List[str], concurrency: int, total_requests: int) -> Dict:
+    """Envoie `total_requests` questions à /ask-qa avec `concurrency` clients simultanés."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def ask(i: int):
+        # Chaque requête est unique : un éventuel cache d'embeddings de l'Indexeur
+        # ne doit pas masquer le coût de l'embedding sous charge.
+        prompt = f"{questions[i % len(questions)]} (requête {i + 1})"
+        t0 = time.perf_counter()
+        try:
+            response = session.post(
+                f"{QA_URL}/ask-qa",
+                json={"prompt": prompt, "history": []},
+                timeout=600,
+            )
+            response.raise_for_status()
+            return time.perf_counter() - t0, None
+        except requests.exceptions.RequestException as e:
+            return None, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(ask, range(total_requests)))
+    wall = time.perf_counter() - start
+
+    samples = [elapsed for elapsed, error in outcomes if error is None]
+    failures = [error for _, error in outcomes if error is not None]
+    if failures:
+        print(f"⚠️ {len(failures)} requête(s) /ask-qa en échec (ex: {failures[0]})")
+    stats = summarize(samples, wall_s=wall, errors=len(failures))
+    stats["concurrency"] = concurrency
+    return stats
+
+
+def scrape_metrics() -> Dict[str, str]:
+    """Récupère /metrics de chaque service (histogrammes par étape côté serveur)."""
+    services = {
+        "doc-ingestor": INGESTOR_URL,
+        "deid-service": DEID_URL,
+        "semantic-indexer": INDEXER_URL,
+        "llm-qa-module": QA_URL,
+    }
+    snapshots = {}
+    for name, url in services.items():
+        try:
+            response = requests.get(f"{url}/metrics", timeout=10)
+            response.raise_for_status()
+            snapshots[name] = response.text
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ /metrics indisponible pour {name} : {e}")
+    return snapshots
+
+
+# --- Résultats ---
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Compare p50/p95 étape par étape et renvoie la liste des régressions au-delà du seuil.
+
+    Une étape sans aucun succès ou avec plus d'erreurs que la référence est une régression.
+    """
+    regressions = []
+    print(f"\n📊 Comparaison avec la référence ({baseline['meta'].get('git_revision')} - {baseline['meta']['timestamp']})")
+    for name, stats in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if not base:
+            continue
+        base_errors, errors = base.get("errors", 0), stats.get("errors", 0)
+        failed = stats["count"] == 0 or errors > base_errors
+        flag = "❌" if failed else "  "
+        print(f"{flag} {name:<24} {'succès':<7} {base['count']:>10} -> {stats['count']:>10}    "
+              f"(erreurs : {base_errors} -> {errors})")
+        if failed:
+            regressions.append(f"{name} : {stats['count']} succès, {errors} erreur(s)")
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if not base[metric]:
+                continue
+            delta = (stats[metric] - base[metric]) / base[metric]
+            flag = "❌" if delta > threshold else "  "
+            print(f"{flag} {name:<24} {metric:<7} {base[metric]:>10.2f} -> {stats[metric]:>10.2f} ms ({delta:+.1%})")
+            if delta > threshold:
+                regressions.append(f"{name}.{metric} {delta:+.1%}")
+    return regressions
+
+
+def print_report(stages: Dict[str, Dict]):
+    print(f"\n{'Étape':<24} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}  débit")
+    for name, stats in stages.items():
+        throughput = ", ".join(f"{v} {k}" for k, v in stats["throughput"].items())
+        print(f"{name:<24} {stats['count']:>5} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} "
+              f"{stats['p99_ms']:>10.2f}  {throughput}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout de DocQA-MS.")
+    parser.add_argument("--corpus", default=str(BENCH_DIR / "corpus"), help="Dossier du corpus synthétique.")
+    parser.add_argument("--count", type=int, default=10, help="Nombre de documents à générer.")
+    parser.add_argument("--size", choices=SIZES, default="medium", help="Taille prédéfinie des documents.")
+    parser.add_argument("--pages", type=int, help="Nombre de pages par document (remplace --size).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--regenerate", action="store_true", help="Régénère le corpus même s'il existe.")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions des étapes locales.")
+    parser.add_argument("--warmup", type=int, default=1, help="Appels de chauffe non mesurés par étape.")
+    parser.add_argument("--skip-local", action="store_true", help="Ne mesure pas les étapes locales.")
+    parser.add_argument("--http", action="store_true", help="Mesure upload_pdf et /ask-qa sur les services lancés.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Niveaux de concurrence pour /ask-qa.")
+    parser.add_argument("--requests", type=int, default=32, help="Requêtes /ask-qa par niveau de concurrence.")
+    parser.add_argument("--allow-existing-index", action="store_true",
+                        help="Accepte un index FAISS non vide avant l'upload (résultats non comparables).")
+    parser.add_argument("--output", help="Fichier JSON de résultats (défaut : results/bench_<date>.json).")
+    parser.add_argument("--compare", help="Fichier JSON d'une exécution de référence.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Seuil de régression (0.10 = +10%%).")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Code de sortie 1 si régression.")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus).resolve()
+    pages = args.pages or SIZES[args.size]
+    manifest_path = corpus_dir / "manifest.json"
+    if args.regenerate or not manifest_path.exists():
+        manifest = generate_corpus(corpus_dir, args.count, pages, args.seed)
+        print(f"✅ Corpus généré : {len(manifest['documents'])} PDF de {pages} page(s) dans {corpus_dir}")
+    else:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        print(f"ℹ️ Corpus existant réutilisé : {len(manifest['documents'])} PDF dans {corpus_dir}")
+
+    output = Path(args.output).resolve() if args.output else (
+        RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    baseline_path = Path(args.compare).resolve() if args.compare else None
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path else None
+
+    stages: Dict[str, Dict] = {}
+    service_metrics: Dict[str, str] = {}
+    http_index: Dict[str, Optional[int]] = {}
+    if not args.skip_local:
+        prepare_workdir(BENCH_DIR / "workdir")
+        stages.update(bench_local(corpus_dir, manifest, args.repeat, args.warmup))
+
+    if args.http:
+        # Chaque exécution doit partir d'un index vide (services lancés via runbench.bat),
+        # sinon /ask-qa cherche dans un index plus gros et les résultats ne sont pas comparables.
+        http_index["before_upload"] = indexer_vector_count()
+        if http_index["before_upload"] and not args.allow_existing_index:
+            sys.exit(f"❌ L'index FAISS de l'Indexeur contient déjà {http_index['before_upload']} vecteurs. "
+                     "Relancez les services avec runbench.bat (dossiers jetables) ou utilisez --allow-existing-index.")
+        print(f"⏳ Upload du corpus via {INGESTOR_URL}/upload-pdf...")
+        stages["upload_pdf"] = bench_upload(corpus_dir, manifest)
+        http_index["after_upload"] = indexer_vector_count()
+        for level in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+            print(f"⏳ /ask-qa : {args.requests} requêtes, concurrence {level}...")
+            stages[f"ask_qa@c{level}"] = bench_ask_qa(manifest["questions"], level, args.requests)
+        service_metrics = scrape_metrics()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": {
+                "documents": len(manifest["documents"]),
+                "pages_per_document": manifest["pages_per_document"],
+                "seed": manifest["seed"],
+            },
+            "args": vars(args),
+            "http_index_vectors": http_index,
+        },
+        "stages": stages,
+        "service_metrics": service_metrics,
+    }
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print_report(stages)
+    print(f"\n💾 Résultats sauvegardés : {output}")
+
+    if baseline:
+        base_index = baseline["meta"].get("http_index_vectors", {}).get("after_upload")
+        if http_index and base_index is not None and http_index.get("after_upload") != base_index:
+            sys.exit(f"❌ Comparaison refusée : taille d'index différente de la référence "
+                     f"({base_index} -> {http_index.get('after_upload')} vecteurs).")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) : {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print("✅ Aucune régression au-delà du seuil.")
+
+
+if __name__ == "__main__":
+    main()
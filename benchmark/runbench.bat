@@ -0,0 +1,44 @@
+@echo off
+color 0E
+echo ========================================================
+echo      SERVICES DE BENCHMARK (DOSSIERS JETABLES + STUB LLM)
+echo ========================================================
+echo.
+
+:: Chaque lancement repart d'un index FAISS, d'un compteur patient et de
+:: dossiers de debug vides : les resultats --http restent comparables.
+set BENCH_WORKDIR=%~dp0http_workdir
+if exist "%BENCH_WORKDIR%" rmdir /s /q "%BENCH_WORKDIR%"
+mkdir "%BENCH_WORKDIR%"
+
+set DOCS_FOLDER=%BENCH_WORKDIR%\documents
+set VECTOR_FOLDER=%BENCH_WORKDIR%\vector_store
+set COUNTER_FILE=%BENCH_WORKDIR%\patient_counter.txt
+set DEBUG_DIR=%BENCH_WORKDIR%\debug_anonymized_docs
+set LLM_ENDPOINT_URL=http://127.0.0.1:8010
+if not defined STUB_LLM_LATENCY_MS set STUB_LLM_LATENCY_MS=300
+
+cd /d %~dp0..
+
+echo [0/4] Lancement Stub LLM (Port 8010)...
+start "0. Stub LLM (Port 8010)" cmd /k "cd benchmark && python -m uvicorn stub_llm:app --port 8010"
+
+echo [1/4] Lancement Ingestor...
+start "1. Ingestor (Port 8000)" cmd /k "cd doc-ingestor && python -m uvicorn main:app --port 8000"
+
+echo [2/4] Lancement Indexeur...
+start "2. Indexeur (Port 8001)" cmd /k "cd semantic-indexer && python -m uvicorn main:app --port 8001"
+
+echo [3/4] Lancement LLM QA (branche sur le stub)...
+start "3. LLM QA (Port 8002)" cmd /k "cd llm-qa-module && python -m uvicorn main:app --port 8002"
+
+echo [4/4] Lancement De-ID...
+start "4. De-ID (Port 8003)" cmd /k "cd deid-service && python -m uvicorn main:app --port 8003"
+
+echo.
+echo ========================================================
+echo      Services prets : lancez
+echo      python run_benchmark.py --http
+echo ========================================================
+echo.
+pause
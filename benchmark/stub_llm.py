@@ -0,0 +1,100 @@
+"""
+Stub local de l'endpoint HuggingFace (API compatible TGI) pour le benchmark.
+
+Remplace Mistral-7B par une réponse fixe avec une latence simulée, afin de mesurer
+le pipeline sans dépendre du réseau ni des quotas HuggingFace.
+
+Lancement :
+    python -m uvicorn stub_llm:app --port 8010
+puis démarrer le service LLM-QA avec LLM_ENDPOINT_URL=http://127.0.0.1:8010
+"""
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "300"))
+STUB_JITTER_MS = float(os.getenv("STUB_LLM_JITTER_MS", "50"))
+MODEL_ID = "mistralai/Mistral-7B-Instruct-v0.2"
+
+STUB_ANSWER = (
+    "| Patient | Information |\n"
+    "|---------|-------------|\n"
+    "| Patient_1 | Réponse simulée par le stub LLM |\n"
+)
+
+
+class ChatRequest(BaseModel):
+    messages: List[Dict[str, Any]]
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+
+
+class GenerateRequest(BaseModel):
+    inputs: str
+    parameters: Dict[str, Any] = {}
+
+
+def simulate_latency():
+    delay = STUB_LATENCY_MS + random.uniform(-STUB_JITTER_MS, STUB_JITTER_MS)
+    time.sleep(max(delay, 0.0) / 1000)
+
+
+def count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+app = FastAPI(title="Stub LLM (HuggingFace / TGI)")
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/info")
+def info():
+    return {"model_id": MODEL_ID, "model_dtype": "stub", "max_total_tokens": 32768}
+
+
+@app.post("/v1/chat/completions")
+def chat_completions(request: ChatRequest):
+    simulate_latency()
+    prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in request.messages)
+    completion_tokens = count_tokens(STUB_ANSWER)
+    return {
+        "id": f"stub-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model or MODEL_ID,
+        "system_fingerprint": "stub",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": STUB_ANSWER},
+            "logprobs": None,
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.post("/generate")
+def generate(request: GenerateRequest):
+    simulate_latency()
+    return {"generated_text": STUB_ANSWER}
+
+
+@app.post("/")
+def generate_root(request: GenerateRequest):
+    simulate_latency()
+    return [{"generated_text": STUB_ANSWER}]
@@ -0,0 +1,90 @@
+import pytest
+
+from corpus import generate_corpus
+from run_benchmark import compare, percentile, summarize
+
+
+def stats_for(samples_s, errors=0):
+    return summarize(samples_s, wall_s=1.0, errors=errors)
+
+
+def results(**stages):
+    return {"meta": {"timestamp": "t", "git_revision": None}, "stages": stages}
+
+
+# --- Percentiles ---
+
+@pytest.mark.parametrize("samples, pct, expected", [
+    ([1, 2, 3, 4, 5], 50, 3),
+    ([1, 2, 3, 4], 50, 2),
+    ([1, 2, 3, 4, 5], 95, 5),
+    (list(range(1, 101)), 50, 50),
+    (list(range(1, 101)), 95, 95),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 11)), 99, 10),
+    ([7], 50, 7),
+])
+def test_percentile_nearest_rank(samples, pct, expected):
+    assert percentile(samples, pct) == expected
+
+
+def test_percentile_empty_is_zero():
+    assert percentile([], 95) == 0.0
+
+
+def test_summarize_reports_ms_and_throughput():
+    stats = summarize([0.1, 0.2, 0.3, 0.4], units={"docs": 8})
+
+    assert stats["count"] == 4
+    assert stats["p50_ms"] == 200.0
+    assert stats["p95_ms"] == 400.0
+    assert stats["throughput"]["ops_per_s"] == 4.0
+    assert stats["throughput"]["docs_per_s"] == 8.0
+
+
+# --- Comparaison ---
+
+def test_compare_flags_stage_without_success():
+    baseline = results(ask=stats_for([0.1, 0.2]))
+    current = results(ask=stats_for([], errors=32))
+
+    regressions = compare(current, baseline, threshold=0.10)
+
+    assert len(regressions) == 1 and regressions[0].startswith("ask")
+
+
+def test_compare_flags_more_errors_than_baseline():
+    baseline = results(ask=stats_for([0.1, 0.2], errors=0))
+    current = results(ask=stats_for([0.1, 0.2], errors=1))
+
+    assert compare(current, baseline, threshold=0.10)
+
+
+def test_compare_flags_p95_rise_above_threshold():
+    baseline = results(ask=stats_for([0.1] * 9 + [1.0]))
+    current = results(ask=stats_for([0.1] * 9 + [1.2]))
+
+    regressions = compare(current, baseline, threshold=0.10)
+
+    assert regressions == ["ask.p95_ms +20.0%"]
+
+
+def test_compare_accepts_identical_runs():
+    baseline = results(ask=stats_for([0.1, 0.2, 0.3]))
+
+    assert compare(baseline, baseline, threshold=0.10) == []
+
+
+# --- Corpus ---
+
+def test_generated_pdf_reopens_with_manifest_page_count(tmp_path):
+    pdfplumber = pytest.importorskip("pdfplumber")
+
+    manifest = generate_corpus(tmp_path, count=2, pages=3, seed=1)
+
+    for document in manifest["documents"]:
+        with pdfplumber.open(tmp_path / document["filename"]) as pdf:
+            assert len(pdf.pages) == document["pages"] == 3
+            text = pdf.pages[0].extract_text()
+        assert "Dr." in text
+        assert "@exemple.fr" in text
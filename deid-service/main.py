@@ -1,12 +1,18 @@
 import os
+import sys
+import logging
 import uvicorn
 import spacy
 import re 
 import requests
+from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_app, log_event, stage, trace_headers
+
 
 
 INDEXER_URL = os.getenv("INDEXER_URL", "http://127.0.0.1:8001") 
@@ -14,8 +20,8 @@ INDEXER_URL = os.getenv("INDEXER_URL", "http://127.0.0.1:8001")
 
 MODEL_NAME = "fr_core_news_md" 
 nlp = None
-COUNTER_FILE = "patient_counter.txt" 
-DEBUG_DIR = "debug_anonymized_docs"
+COUNTER_FILE = os.getenv("COUNTER_FILE", "patient_counter.txt")
+DEBUG_DIR = os.getenv("DEBUG_DIR", "debug_anonymized_docs")
 
 def load_nlp_model():
     """Charge le modèle SpaCy au démarrage."""
@@ -42,7 +48,7 @@ def get_next_patient_id():
                 if content.isdigit():
                     current_id = int(content)
         except Exception as e:
-            print(f"⚠️ Erreur lecture compteur, réinitialisation à 1 : {e}")
+            log_event("patient_counter_read_error", level=logging.WARNING, error=str(e))
             current_id = 1
     
     patient_label = f"Patient_{current_id}"
@@ -51,7 +57,7 @@ def get_next_patient_id():
         with open(COUNTER_FILE, "w") as f:
             f.write(str(current_id + 1))
     except Exception as e:
-        print(f"⚠️ Impossible de sauvegarder le compteur : {e}")
+        log_event("patient_counter_write_error", level=logging.WARNING, error=str(e))
         
     return patient_label
 
@@ -71,22 +77,23 @@ def advanced_anonymization(text: str, patient_label: str) -> str:
     Remplace les noms par l'ID du patient (ex: Patient_1) pour que le tableau final soit clair.
     """
     
-  
-    text = re.sub(r'[\w\.-]+@[\w\.-]+\.\w+', '[EMAIL_MASQUÉ]', text)
-    
-  
-    phone_pattern = r'(?:(?:\+|00)33|0)\s*[1-9](?:[\s.-]*\d{2}){4}'
-    text = re.sub(phone_pattern, '[TÉL_MASQUÉ]', text)
+    with stage("regex_masking"):
+        text = re.sub(r'[\w\.-]+@[\w\.-]+\.\w+', '[EMAIL_MASQUÉ]', text)
+        
+      
+        phone_pattern = r'(?:(?:\+|00)33|0)\s*[1-9](?:[\s.-]*\d{2}){4}'
+        text = re.sub(phone_pattern, '[TÉL_MASQUÉ]', text)
 
-    field_pattern = r'(Nom|Prénom|Patient|Surnom)\s*[:\.]?\s+([A-ZÀ-ÿ][a-zÀ-ÿ]+|[A-Z]{2,})'
-    text = re.sub(field_pattern, f"\\1 : {patient_label}", text, flags=re.IGNORECASE)
+        field_pattern = r'(Nom|Prénom|Patient|Surnom)\s*[:\.]?\s+([A-ZÀ-ÿ][a-zÀ-ÿ]+|[A-Z]{2,})'
+        text = re.sub(field_pattern, f"\\1 : {patient_label}", text, flags=re.IGNORECASE)
 
 
-    text = re.sub(r'(Dr\.?)\s+([A-ZÀ-ÿ][a-zÀ-ÿ]+)', r'\1 [MEDECIN]', text)
-    text = re.sub(r'(Monsieur|Madame|M\.|Mme)\s+([A-ZÀ-ÿ][a-zÀ-ÿ]+)', f"\\1 {patient_label}", text)
+        text = re.sub(r'(Dr\.?)\s+([A-ZÀ-ÿ][a-zÀ-ÿ]+)', r'\1 [MEDECIN]', text)
+        text = re.sub(r'(Monsieur|Madame|M\.|Mme)\s+([A-ZÀ-ÿ][a-zÀ-ÿ]+)', f"\\1 {patient_label}", text)
 
  
-    doc = nlp(text)
+    with stage("spacy_ner"):
+        doc = nlp(text)
     entities_to_replace = []
     
     for ent in doc.ents:
@@ -106,6 +113,7 @@ def advanced_anonymization(text: str, patient_label: str) -> str:
 
 
 app = FastAPI(title="De-ID Microservice (Injection ID Patient)")
+instrument_app(app, "deid-service")
 
 @app.on_event("startup")
 async def startup_event():
@@ -117,19 +125,19 @@ def anonymize_and_index(request: DeIDRequest):
         raise HTTPException(status_code=503, detail="Le modèle NLP n'est pas prêt.")
 
     unique_patient_id = get_next_patient_id()
-    print(f"🆔 Nouveau document : {request.source} -> ID attribué : {unique_patient_id}")
+    log_event("document_received", source=request.source, patient_id=unique_patient_id, chars=len(request.content))
 
 
     try:
-        clean_text = advanced_anonymization(request.content, unique_patient_id)
+        with stage("anonymization"):
+            clean_text = advanced_anonymization(request.content, unique_patient_id)
         
 
         filename = f"{unique_patient_id}.txt"
         filepath = os.path.join(DEBUG_DIR, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
+        with stage("debug_write"), open(filepath, "w", encoding="utf-8") as f:
             f.write(f"--- SOURCE ORIGINALE : {request.source} ---\n\n")
             f.write(clean_text)
-        print(f"💾 Fichier transformé sauvegardé : {filepath}")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne d'anonymisation : {e}")
@@ -143,8 +151,9 @@ def anonymize_and_index(request: DeIDRequest):
     }
 
     try:
-        response = requests.post(ingest_endpoint, json=data)
-        response.raise_for_status() 
+        with stage("indexer_call"):
+            response = requests.post(ingest_endpoint, json=data, headers=trace_headers())
+            response.raise_for_status() 
         
         return {
             "status": "success",
@@ -154,7 +163,7 @@ def anonymize_and_index(request: DeIDRequest):
             "anonymized_preview": clean_text[:200]
         }
     except requests.exceptions.RequestException as e:
-        print(f"❌ Erreur connexion Indexeur (8001): {e}")
+        log_event("indexer_unreachable", level=logging.ERROR, error=str(e))
         raise HTTPException(status_code=503, detail=f"Indexeur injoignable: {e}")
 
 # if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import os
+import sys
 import uvicorn
 import requests
 from pathlib import Path
@@ -6,6 +7,9 @@ from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import pdfplumber
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import TRACE_HEADER, instrument_app, stage, trace_headers
+
 
 
 DOCS_FOLDER = os.getenv("DOCS_FOLDER", "documents")
@@ -22,14 +26,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TRACE_HEADER],
 )
 
+instrument_app(app, "doc-ingestor")
+
 
 
 def pdf_to_text(path: Path) -> str:
     text = ""
     try:
-        with pdfplumber.open(path) as pdf:
+        with stage("pdf_to_text"), pdfplumber.open(path) as pdf:
             for page in pdf.pages:
                 if page.extract_text():
                     text += page.extract_text() + "\n"
@@ -50,8 +57,9 @@ async def upload_pdf(file: UploadFile = File(...)):
 
   
     try:
-        content = await file.read()
-        file_path.write_bytes(content)
+        with stage("save_upload"):
+            content = await file.read()
+            file_path.write_bytes(content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de sauvegarde: {e}")
     finally:
@@ -71,9 +79,9 @@ async def upload_pdf(file: UploadFile = File(...)):
     }
 
     try:
-  
-        response = requests.post(target_endpoint, json=data)
-        response.raise_for_status()
+        with stage("anonymizer_call"):
+            response = requests.post(target_endpoint, json=data, headers=trace_headers())
+            response.raise_for_status()
         
         return {
             "status": "success",
@@ -1,7 +1,9 @@
 
 import os
+import sys
 import uvicorn
 import requests
+from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
@@ -14,30 +16,43 @@ load_dotenv()
 from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
 from langchain_core.messages import SystemMessage
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import TRACE_HEADER, instrument_app, log_event, stage, trace_headers
+
 
 
 INDEXER_URL = os.getenv("INDEXER_URL", "http://127.0.0.1:8001") 
 
+LLM_REPO_ID = "mistralai/Mistral-7B-Instruct-v0.2"
+# Permet de remplacer l'API HuggingFace par un serveur compatible TGI (ex: le stub du benchmark).
+LLM_ENDPOINT_URL = os.getenv("LLM_ENDPOINT_URL")
+
 chat_model: Optional[ChatHuggingFace] = None
 
 def load_llm():
     global chat_model
     hf_token = os.getenv("HF_TOKEN")
-    if not hf_token:
+    # Un endpoint local (stub du benchmark) ne demande pas de token HuggingFace.
+    if not hf_token and not LLM_ENDPOINT_URL:
         print("CRITIQUE: HF_TOKEN non défini.")
         return
 
+    if LLM_ENDPOINT_URL:
+        endpoint_kwargs = {"endpoint_url": LLM_ENDPOINT_URL}
+    else:
+        endpoint_kwargs = {"repo_id": LLM_REPO_ID}
+
     try:
 
         llm = HuggingFaceEndpoint(
-            repo_id="mistralai/Mistral-7B-Instruct-v0.2",
+            **endpoint_kwargs,
           
             huggingfacehub_api_token=hf_token,
             temperature=0.01,       
             max_new_tokens=2048,    
         )
         chat_model = ChatHuggingFace(llm=llm)
-        print("✅ LLM (Mistral-7B) chargé.")
+        print(f"✅ LLM chargé : {LLM_ENDPOINT_URL or LLM_REPO_ID}.")
     except Exception as e:
         print(f"⚠️ Erreur de chargement du LLM : {e}")
 
@@ -112,8 +127,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TRACE_HEADER],
 )
 
+instrument_app(app, "llm-qa-module")
+
 @app.on_event("startup")
 async def startup_event():
     load_llm()
@@ -128,11 +146,13 @@ def ask_qa(input_data: QAInput):
 
     retrieval_endpoint = f"{INDEXER_URL}/retrieve-chunks"
     try:
-        response = requests.post(
-            retrieval_endpoint, 
-            json={"question": input_data.prompt, "k": 6, "score_threshold": 0.75}
-        )
-        response.raise_for_status()
+        with stage("retrieval"):
+            response = requests.post(
+                retrieval_endpoint, 
+                json={"question": input_data.prompt, "k": 6, "score_threshold": 0.75},
+                headers=trace_headers()
+            )
+            response.raise_for_status()
         relevant_chunks = RetrievalResponse.model_validate(response.json()).chunks
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Erreur Indexeur: {e}")
@@ -148,17 +168,14 @@ def ask_qa(input_data: QAInput):
 
     context = "\n\n".join([f"[Source: {chunk.source}]\n{chunk.content}" for chunk in relevant_chunks])
 
-    print("==================================================")
-    print("🔍 CE QUE L'IA REÇOIT (CONTEXTE) :")
-    print(context)
-    print("==================================================")
-    
     sources = list(set([chunk.source for chunk in relevant_chunks]))
+    log_event("qa_context", chunks=len(relevant_chunks), context_chars=len(context), sources=sources)
     
     messages = build_rag_messages(input_data.prompt, context, input_data.history)
     
     try:
-        answer = chat_model.invoke(messages).content.strip()
+        with stage("llm"):
+            answer = chat_model.invoke(messages).content.strip()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur LLM: {e}")
     
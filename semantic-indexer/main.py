@@ -1,15 +1,19 @@
 import os
+import sys
 import uvicorn
+from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import gauge, instrument_app, stage
+
 
 VECTOR_FOLDER = os.getenv("VECTOR_FOLDER", "vector_store")
 os.makedirs(VECTOR_FOLDER, exist_ok=True)
@@ -18,6 +22,12 @@ FAISS_INDEX_PATH = os.path.join(VECTOR_FOLDER, "faiss.index")
 
 embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
 
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=2000,
+    chunk_overlap=200,
+    separators=["\n\n", "\n", ".", " ", ""]
+)
+
 
 vectorstore: Optional[FAISS] = None
 
@@ -43,6 +53,10 @@ def load_vector_store():
         vectorstore = None
 
 
+gauge("docqa_faiss_index_vectors", "Nombre de vecteurs dans l'index FAISS.",
+      function=lambda: vectorstore.index.ntotal if vectorstore else 0)
+
+
 
 class RetrievalRequest(BaseModel):
     """Schéma pour la requête de recherche de fragments."""
@@ -68,6 +82,7 @@ class RetrievalResponse(BaseModel):
 
 
 app = FastAPI(title="Semantic Indexer Microservice")
+instrument_app(app, "semantic-indexer")
 
 @app.on_event("startup")
 async def startup_event():
@@ -86,24 +101,24 @@ def index_document(request: IngestRequest):
     if not text.strip():
         raise HTTPException(status_code=400, detail="Contenu du document vide.")
 
-    splitter = RecursiveCharacterTextSplitter(
-    chunk_size=2000,   
-    chunk_overlap=200,  
-    separators=["\n\n", "\n", ".", " ", ""] 
-)
-    chunks = splitter.split_text(text)
-    docs = [Document(page_content=c, metadata={"source": source}) for c in chunks]
+    with stage("chunking"):
+        chunks = text_splitter.split_text(text)
+    metadatas = [{"source": source} for _ in chunks]
 
+    with stage("embedding"):
+        vectors = embeddings.embed_documents(chunks)
 
-    if not vectorstore:
-        vectorstore = FAISS.from_documents(docs, embeddings)
-    else:
-        vectorstore.add_documents(docs)
+    with stage("faiss_add"):
+        if not vectorstore:
+            vectorstore = FAISS.from_embeddings(list(zip(chunks, vectors)), embeddings, metadatas=metadatas)
+        else:
+            vectorstore.add_embeddings(list(zip(chunks, vectors)), metadatas=metadatas)
 
 
     try:
-        vectorstore.save_local(VECTOR_FOLDER, "faiss.index")
-        return {"status": "success", "message": f"Indexé : {source} ({len(docs)} morceaux)"}
+        with stage("faiss_save"):
+            vectorstore.save_local(VECTOR_FOLDER, "faiss.index")
+        return {"status": "success", "message": f"Indexé : {source} ({len(chunks)} morceaux)"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la sauvegarde FAISS : {e}")
 
@@ -114,10 +129,14 @@ def retrieve_chunks(request: RetrievalRequest):
 
         return RetrievalResponse(chunks=[])
     
-    docs_scores = vectorstore.similarity_search_with_score(
-        request.question,
-        k=request.k
-    )
+    with stage("query_embedding"):
+        question_vector = embeddings.embed_query(request.question)
+
+    with stage("faiss_search"):
+        docs_scores = vectorstore.similarity_search_with_score_by_vector(
+            question_vector,
+            k=request.k
+        )
     
 
     relevant = [
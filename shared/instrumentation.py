@@ -0,0 +1,416 @@
+"""
+Instrumentation partagée des microservices DocQA-MS.
+
+- Métriques au format texte Prometheus exposées sur `/metrics` (sans dépendance externe).
+- Histogrammes de latence par étape (`with stage("pdf_to_text"): ...`).
+- Gauges de concurrence (requêtes en cours, threadpool occupé / en attente).
+- Trace ID propagé via l'en-tête `X-Request-ID` d'un service à l'autre.
+- Logs structurés (JSON) échantillonnés : un appel non retenu ne coûte qu'un tirage aléatoire.
+
+Usage dans un service :
+    app = FastAPI(...)
+    instrument_app(app, "doc-ingestor")
+    requests.post(url, json=data, headers=trace_headers())
+"""
+import bisect
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+TRACE_HEADER = "X-Request-ID"
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    LOG_LEVEL = "INFO"  # Valeur invalide : ne doit pas empêcher le service de démarrer.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+trace_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_logger_state: Dict[str, Optional[str]] = {"service": None}
+
+
+# --- Métriques ---
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base commune : nom, aide, noms de labels et stockage protégé par un verrou."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        """Valeurs stockées, ou lues au moment du scrape si `function` est fournie.
+
+        Avec des labels, `function` renvoie un dict {valeurs_des_labels: valeur}.
+        """
+        if self.function is None:
+            with self._lock:
+                return list(self._values.items())
+        try:
+            result = self.function()
+        except Exception:
+            return []
+        return [(tuple(key), value) for key, value in result.items()] if isinstance(result, dict) else [((), result)]
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Compteur croissant ; avec `function`, lit un total cumulé tenu ailleurs (ex: cache_info)."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key, value in self._items():
+            yield self.name, self.labelnames, key, value
+
+
+class Gauge(Metric):
+    """Gauge classique, ou calculée au moment du scrape si `function` est fournie."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        for key, value in self._items():
+            yield self.name, self.labelnames, key, value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", names, key + (_format_value(bound),), cumulative
+            yield self.name + "_sum", self.labelnames, key, total
+            yield self.name + "_count", self.labelnames, key, count
+
+
+class Registry:
+    """Ensemble des métriques d'un processus, rendues au format texte Prometheus 0.0.4."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        self.const_labels: Dict[str, str] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Idempotent : un module rechargé (uvicorn --reload, benchmark) retrouve la même métrique.
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        const_names = tuple(self.const_labels)
+        const_values = tuple(self.const_labels.values())
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, names, values, value in metric.samples():
+                labels = _format_labels(const_names + names, const_values + values)
+                lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _register(metric: Metric) -> Metric:
+    registered = REGISTRY.register(metric)
+    if metric.function is not None:
+        registered.function = metric.function
+    return registered
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = (),
+            function: Optional[Callable] = None) -> Counter:
+    return _register(Counter(name, documentation, labelnames, function))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (),
+          function: Optional[Callable] = None) -> Gauge:
+    return _register(Gauge(name, documentation, labelnames, function))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+HTTP_REQUESTS = counter(
+    "docqa_http_requests_total", "Requêtes HTTP traitées.", ("method", "path", "status"))
+HTTP_LATENCY = histogram(
+    "docqa_http_request_duration_seconds", "Latence des requêtes HTTP.", ("method", "path"))
+HTTP_IN_FLIGHT = gauge(
+    "docqa_http_requests_in_flight", "Requêtes HTTP en cours de traitement.")
+STAGE_LATENCY = histogram(
+    "docqa_stage_duration_seconds", "Latence de chaque étape du pipeline.", ("stage",))
+
+
+def _threadpool_stats() -> Dict[Tuple[str, ...], float]:
+    # Les endpoints synchrones de FastAPI s'exécutent dans le threadpool anyio :
+    # les tâches en attente d'un thread forment la file d'attente du service.
+    import anyio.to_thread
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        ("capacity",): limiter.total_tokens,
+        ("busy",): stats.borrowed_tokens,
+        ("waiting",): stats.tasks_waiting,
+    }
+
+
+gauge("docqa_threadpool_threads", "Threads du threadpool (capacity, busy, waiting).", ("state",),
+      function=_threadpool_stats)
+
+
+_CACHES: Dict[str, Callable] = {}
+
+
+def _cache_stats(field: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def read():
+        values = {}
+        for name, cache_info in _CACHES.items():
+            info = cache_info()
+            if field == "ratio":
+                lookups = info.hits + info.misses
+                values[(name,)] = info.hits / lookups if lookups else 0.0
+            else:
+                values[(name,)] = getattr(info, field)
+        return values
+    return read
+
+
+counter("docqa_cache_hits_total", "Succès cumulés du cache.", ("cache",), function=_cache_stats("hits"))
+counter("docqa_cache_misses_total", "Échecs cumulés du cache.", ("cache",), function=_cache_stats("misses"))
+gauge("docqa_cache_hit_ratio", "Ratio de succès du cache.", ("cache",), function=_cache_stats("ratio"))
+
+
+def register_cache(name: str, cache_info: Callable) -> None:
+    """Expose les hits, misses et le ratio de succès d'un cache `functools.lru_cache`."""
+    _CACHES[name] = cache_info
+
+
+@contextmanager
+def stage(name: str):
+    """Mesure la durée d'un bloc dans l'histogramme `docqa_stage_duration_seconds`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=name)
+
+
+# --- Trace ID ---
+
+def current_trace_id() -> Optional[str]:
+    return trace_id_var.get()
+
+
+def trace_headers() -> Dict[str, str]:
+    """En-têtes à transmettre aux appels vers un autre microservice."""
+    trace_id = trace_id_var.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+
+class InstrumentationMiddleware:
+    """Middleware ASGI : trace ID, latence, compteurs et requêtes en cours.
+
+    Exception non gérée : elle est journalisée avec le trace ID puis relancée. Si l'application
+    n'a ni `debug=True` ni handler pour `Exception`/500, le middleware envoie lui-même un 500
+    texte portant `X-Request-ID` (le 500 par défaut de Starlette est construit plus à
+    l'extérieur, sans l'en-tête). Sinon la réponse est laissée à Starlette et n'a pas d'en-tête.
+    """
+
+    def __init__(self, app, routed_app=None):
+        self.app = app
+        self.routed_app = routed_app
+        self._known_paths: Optional[set] = None
+
+    def _app_handles_errors(self) -> bool:
+        handlers = getattr(self.routed_app, "exception_handlers", {})
+        return bool(getattr(self.routed_app, "debug", False)) or Exception in handlers or 500 in handlers
+
+    def _path_label(self, path: str) -> str:
+        # Limite la cardinalité : les chemins inconnus (404, scans) sont regroupés.
+        if self._known_paths is None:
+            routes = getattr(self.routed_app, "routes", [])
+            self._known_paths = {getattr(route, "path", None) for route in routes}
+        return path if path in self._known_paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                trace_id = value.decode("latin-1").strip()
+                break
+        if not trace_id or not _TRACE_ID_PATTERN.match(trace_id):
+            trace_id = uuid.uuid4().hex
+        token = trace_id_var.set(trace_id)
+
+        status_code = 500
+        response_started = False
+
+        async def send_with_trace(message):
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", trace_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        method, path = scope["method"], self._path_label(scope["path"])
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except Exception as e:
+            # Voir la docstring : 500 avec trace ID, sauf si l'application gère ses erreurs.
+            status_code = 500
+            log_event("unhandled_exception", level=logging.ERROR, method=method, path=scope["path"],
+                      error=f"{type(e).__name__}: {e}")
+            if not response_started and not self._app_handles_errors():
+                await send_with_trace({
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+                })
+                await send_with_trace({"type": "http.response.body", "body": b"Internal Server Error"})
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=method, path=path)
+            HTTP_REQUESTS.inc(method=method, path=path, status=str(status_code))
+            trace_id_var.reset(token)
+
+
+def instrument_app(app, service: str) -> None:
+    """Branche le middleware et l'endpoint `/metrics` sur une application FastAPI."""
+    from fastapi import Response
+
+    REGISTRY.const_labels = {"service": service}
+    _logger_state["service"] = service
+    app.add_middleware(InstrumentationMiddleware, routed_app=app)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- Logs structurés échantillonnés ---
+
+logger = logging.getLogger("docqa")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, sample_rate: Optional[float] = None, **fields):
+    """Écrit un log JSON d'une ligne, avec le trace ID courant.
+
+    Les événements sous WARNING ne sont émis que pour une fraction `LOG_SAMPLE_RATE`
+    des appels ; les avertissements et erreurs sont toujours émis.
+    """
+    if level < logging.WARNING:
+        rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return
+    if not logger.isEnabledFor(level):
+        return
+    record = {
+        "ts": round(time.time(), 3),
+        "level": logging.getLevelName(level),
+        "service": _logger_state["service"],
+        "event": event,
+        "trace_id": trace_id_var.get(),
+        **fields,
+    }
+    logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
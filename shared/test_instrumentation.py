@@ -0,0 +1,229 @@
+import logging
+from functools import lru_cache
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from shared import instrumentation
+from shared.instrumentation import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    instrument_app,
+    log_event,
+    register_cache,
+    stage,
+    trace_headers,
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_globals(monkeypatch):
+    # instrument_app et register_cache modifient l'état du module : on le restaure après chaque test.
+    monkeypatch.setattr(instrumentation.REGISTRY, "const_labels", {})
+    monkeypatch.setattr(instrumentation, "_CACHES", dict(instrumentation._CACHES))
+    monkeypatch.setitem(instrumentation._logger_state, "service", None)
+
+
+def render(*metrics, const_labels=None):
+    registry = Registry()
+    registry.const_labels = const_labels or {}
+    for metric in metrics:
+        registry.register(metric)
+    return registry.render().splitlines()
+
+
+# --- Format Prometheus ---
+
+def test_histogram_buckets_are_cumulative_and_le_inclusive():
+    histogram = Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.1, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(2.0, stage="a")
+
+    lines = render(histogram)
+
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="a"} 2.6' in lines
+    assert 'demo_seconds_count{stage="a"} 3' in lines
+    assert "# TYPE demo_seconds histogram" in lines
+
+
+def test_label_values_are_escaped():
+    counter = Counter("demo_total", "Demo.", ("path",))
+    counter.inc(path='a"b\\c\nd')
+
+    assert 'demo_total{path="a\\"b\\\\c\\nd"} 1' in render(counter)
+
+
+def test_const_labels_come_first():
+    gauge = Gauge("demo_size", "Demo.")
+    gauge.set(3)
+
+    assert 'demo_size{service="svc"} 3' in render(gauge, const_labels={"service": "svc"})
+
+
+def test_function_backed_metrics_are_read_at_scrape_time():
+    value = {"n": 1}
+    gauge = Gauge("demo_live", "Demo.", function=lambda: value["n"])
+    counter = Counter("demo_reads_total", "Demo.", ("cache",), function=lambda: {("c",): 5})
+    value["n"] = 7
+
+    lines = render(gauge, counter)
+
+    assert "demo_live 7" in lines
+    assert 'demo_reads_total{cache="c"} 5' in lines
+    assert "# TYPE demo_reads_total counter" in lines
+
+
+def test_cache_totals_are_counters_and_ratio_is_gauge(monkeypatch):
+    @lru_cache(maxsize=4)
+    def square(x):
+        return x * x
+
+    monkeypatch.setitem(instrumentation._CACHES, "test_square", square.cache_info)
+    register_cache("test_square", square.cache_info)
+    square(2), square(2), square(2), square(3)
+
+    lines = instrumentation.REGISTRY.render().splitlines()
+    values = {
+        line.split("{")[0]: line.rsplit(" ", 1)[1]
+        for line in lines if 'cache="test_square"' in line
+    }
+
+    assert "# TYPE docqa_cache_hits_total counter" in lines
+    assert "# TYPE docqa_cache_misses_total counter" in lines
+    assert "# TYPE docqa_cache_hit_ratio gauge" in lines
+    assert values == {
+        "docqa_cache_hits_total": "2",
+        "docqa_cache_misses_total": "2",
+        "docqa_cache_hit_ratio": "0.5",
+    }
+
+
+# --- Trace ID ---
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    instrument_app(app, "test-service")
+
+    @app.get("/sync")
+    def sync_endpoint():
+        with stage("test_stage"):
+            return trace_headers()
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_valid_trace_id_is_propagated_through_sync_endpoint(client):
+    response = client.get("/sync", headers={"X-Request-ID": "abc-123"})
+
+    assert response.headers["x-request-id"] == "abc-123"
+    assert response.json() == {"X-Request-ID": "abc-123"}
+
+
+@pytest.mark.parametrize("header", [None, "bad id", "x" * 200, "a/b"])
+def test_missing_or_invalid_trace_id_is_replaced(client, header):
+    headers = {"X-Request-ID": header} if header is not None else {}
+    response = client.get("/sync", headers=headers)
+
+    trace_id = response.headers["x-request-id"]
+    assert trace_id != header
+    assert len(trace_id) == 32
+    assert response.json() == {"X-Request-ID": trace_id}
+
+
+def test_trace_headers_empty_outside_request():
+    assert trace_headers() == {}
+
+
+def test_unhandled_exception_keeps_trace_id_and_is_logged(client, log_records):
+    response = client.get("/boom", headers={"X-Request-ID": "err-1"})
+
+    assert response.status_code == 500
+    assert response.headers["x-request-id"] == "err-1"
+    errors = [r for r in log_records if '"unhandled_exception"' in r]
+    assert errors and '"trace_id": "err-1"' in errors[0]
+
+
+def test_app_error_handler_is_not_bypassed(log_records):
+    app = FastAPI()
+    instrument_app(app, "test-service")
+
+    @app.exception_handler(Exception)
+    async def handle(request, exc):
+        return JSONResponse({"handled": True}, status_code=500)
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    response = TestClient(app, raise_server_exceptions=False).get("/boom", headers={"X-Request-ID": "err-2"})
+
+    assert response.json() == {"handled": True}
+    assert any('"trace_id": "err-2"' in r for r in log_records if '"unhandled_exception"' in r)
+
+
+def test_metrics_endpoint_reports_requests_and_stages(client):
+    client.get("/sync")
+    client.get("/unknown")
+
+    text = client.get("/metrics").text
+
+    assert 'path="/sync",status="200"' in text
+    assert 'path="other",status="404"' in text
+    assert 'stage="test_stage"' in text
+
+
+# --- Logs échantillonnés ---
+
+@pytest.fixture
+def log_records():
+    records = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    handler = ListHandler()
+    instrumentation.logger.addHandler(handler)
+    yield records
+    instrumentation.logger.removeHandler(handler)
+
+
+def test_info_events_are_sampled(log_records):
+    log_event("kept", sample_rate=1.0, a=1)
+    log_event("dropped", sample_rate=0.0)
+
+    assert len(log_records) == 1
+    assert '"event": "kept"' in log_records[0]
+    assert '"a": 1' in log_records[0]
+
+
+def test_warnings_and_errors_bypass_sampling(log_records):
+    log_event("warn", level=logging.WARNING, sample_rate=0.0)
+    log_event("error", level=logging.ERROR, sample_rate=0.0)
+
+    assert len(log_records) == 2
+
+
+def test_default_sample_rate_is_applied(log_records, monkeypatch):
+    monkeypatch.setattr(instrumentation, "LOG_SAMPLE_RATE", 0.5)
+    values = iter([0.4, 0.6])
+    monkeypatch.setattr(instrumentation.random, "random", lambda: next(values))
+
+    log_event("first")
+    log_event("second")
+
+    assert len(log_records) == 1
+    assert '"event": "first"' in log_records[0]